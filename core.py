@@ -19,6 +19,12 @@ class Dataset(object):
     overriden if accessing files.
     """
 
+    # Subclasses which own their keys may set this to memoize `keys()`. They
+    # must call `_clear_keys_cache` whenever their keys change.
+    _memoize_keys = False
+    _keys_cache = None
+    _keyset_cache = None
+
     def keys(self):
         raise NotImplementedError('Abstract method')
 
@@ -29,20 +35,54 @@ class Dataset(object):
     def is_open(self):
         return True
 
+    def _cached_keys(self):
+        """
+        `keys()`, memoized as a tuple if `_memoize_keys`.
+
+        Memoized keys are kept until the next `open`/`close` or
+        `_clear_keys_cache` call.
+        """
+        if not self._memoize_keys:
+            return self.keys()
+        if self._keys_cache is None:
+            self._keys_cache = tuple(self.keys())
+        return self._keys_cache
+
+    def _cached_keyset(self):
+        """`frozenset` version of `_cached_keys` if `_memoize_keys`."""
+        if not self._memoize_keys:
+            return self.keys()
+        if self._keyset_cache is None:
+            self._keyset_cache = frozenset(self._cached_keys())
+        return self._keyset_cache
+
+    def _clear_keys_cache(self):
+        self._keys_cache = None
+        self._keyset_cache = None
+
     def __contains__(self, key):
-        return key in self.keys()
+        return key in self._cached_keyset()
 
     def __iter__(self):
-        return iter(self.keys())
+        return iter(self._cached_keys())
+
+    def get_many(self, keys):
+        """
+        Get the values associated with each of `keys` as a list.
+
+        Subclasses may override this for more efficient bulk access, which
+        `to_dict` uses.
+        """
+        return [self[k] for k in keys]
 
     def values(self):
-        return (self[k] for k in self.keys())
+        return (self[k] for k in self._cached_keys())
 
     def items(self):
-        return ((k, self[k]) for k in self.keys())
+        return ((k, self[k]) for k in self._cached_keys())
 
     def __len__(self):
-        return len(self.keys())
+        return len(self._cached_keys())
 
     def __enter__(self):
         self.open()
@@ -52,13 +92,15 @@ class Dataset(object):
         self.close()
 
     def open(self):
-        pass
+        self._clear_keys_cache()
 
     def close(self):
-        pass
+        self._clear_keys_cache()
 
     def to_dict(self):
-        return {k: v for k, v in self.items()}
+        # materialized once, as keys may be a generator
+        keys = list(self._cached_keys())
+        return dict(zip(keys, self.get_many(keys)))
 
     def subset(self, keys, check_present=True):
         return DataSubset(self, keys, check_present=check_present)
@@ -66,6 +108,14 @@ class Dataset(object):
     def map(self, map_fn):
         return MappedDataset(self, map_fn)
 
+    def map_numba(self, map_fn):
+        """
+        Map values with `map_fn` compiled by `numba.njit`.
+
+        Intended for numeric functions of array values. Requires `numba`.
+        """
+        return NumbaMappedDataset(self, map_fn)
+
     def map_keys(self, key_fn):
         return KeyMappedDataset(self, key_fn)
 
@@ -107,10 +157,14 @@ class DelegatingDataset(Dataset):
         if base_dataset is None:
             raise ValueError('`base_dataset` cannot be None')
         self._base = base_dataset
+        # resolved once rather than `hasattr` checks on each call
+        self._base_open = getattr(base_dataset, 'open', None)
+        self._base_close = getattr(base_dataset, 'close', None)
+        self._base_has_is_open = hasattr(base_dataset, 'is_open')
 
     @property
     def is_open(self):
-        if hasattr(self._base, 'is_open'):
+        if self._base_has_is_open:
             return self._base.is_open
         else:
             return True
@@ -122,12 +176,14 @@ class DelegatingDataset(Dataset):
         return self._base[key]
 
     def open(self):
-        if hasattr(self._base, 'open'):
-            self._base.open()
+        self._clear_keys_cache()
+        if self._base_open is not None:
+            self._base_open()
 
     def close(self):
-        if hasattr(self._base, 'close'):
-            self._base.close()
+        self._clear_keys_cache()
+        if self._base_close is not None:
+            self._base_close()
 
 
 class DictDataset(DelegatingDataset):
@@ -139,6 +195,9 @@ class DictDataset(DelegatingDataset):
     def __iter__(self):
         return iter(self._base)
 
+    def __len__(self):
+        return len(self._base)
+
     @property
     def is_open(self):
         return True
@@ -151,10 +210,84 @@ class DictDataset(DelegatingDataset):
 
 
 def key_intersection(keys_iterable):
-    s = sets.entire_set
+    """
+    Intersection of a number of key collections.
+
+    Finite collections are intersected smallest first, stopping as soon as the
+    result is empty. Infinite sets (see `sets`) are only used to filter the
+    finite result, and `sets.entire_set` is returned if there are no finite
+    collections.
+    """
+    keysets = []
+    infinite = []
     for keys in keys_iterable:
-        s = s.intersection(keys)
-    return s
+        if isinstance(keys, sets.InfiniteSet):
+            infinite.append(keys)
+        elif isinstance(keys, (set, frozenset)):
+            keysets.append(keys)
+        else:
+            keysets.append(frozenset(keys))
+
+    if len(keysets) == 0:
+        s = sets.entire_set
+        for keys in infinite:
+            s = s.intersection(keys)
+        return s
+
+    keysets.sort(key=len)
+    acc = set(keysets[0])
+    for keys in keysets[1:]:
+        if len(acc) == 0:
+            break
+        acc.intersection_update(keys)
+    for keys in infinite:
+        acc = set(k for k in acc if k in keys)
+    return frozenset(acc)
+
+
+def _compile_getter(getters, keys=None):
+    """
+    Compile a function mapping `key` to the result of each of `getters`.
+
+    The compiled function returns a dict literal with the given `keys` if
+    provided, otherwise a tuple literal. `getters` are bound as closure
+    variables, so calls involve no iteration or attribute lookups.
+    """
+    names = ['_g%d' % i for i in range(len(getters))]
+    calls = ['%s(key)' % name for name in names]
+    if keys is None:
+        body = '(%s)' % ''.join('%s, ' % call for call in calls)
+    else:
+        body = '{%s}' % ', '.join(
+            '%r: %s' % (k, call) for k, call in zip(keys, calls))
+    source = (
+        'def _make(%s):\n'
+        '    def _get(key):\n'
+        '        return %s\n'
+        '    return _get\n' % (', '.join(names), body))
+    namespace = {}
+    exec(source, namespace)
+    return namespace['_make'](*getters)
+
+
+def _compose(f, g):
+    """Function equivalent to `lambda x: g(f(x))`."""
+    def composed(x):
+        return g(f(x))
+    return composed
+
+
+def _cheap_len(dataset):
+    """
+    Number of keys of `dataset` if already known, otherwise infinity.
+
+    Never calls `keys()`, which may be expensive, e.g. for nested compounds.
+    """
+    if dataset._keyset_cache is not None:
+        return len(dataset._keyset_cache)
+    if isinstance(dataset, (DictDataset, DataSubset)):
+        return len(dataset)
+    return float('inf')
 
 
 class CompoundDataset(Dataset):
@@ -174,10 +307,16 @@ class CompoundDataset(Dataset):
     print(xy['world'])  # {'first': 5, 'second': 'worldworld'}
     ```
     """
+    _sorted_datasets = None
+
     def __init__(self, **datasets):
         if not all(isinstance(d, Dataset) for d in datasets.values()):
             raise TypeError('All values of `dataset_dict` must be `Dataset`s')
         self._dataset_dict = datasets
+        self._datasets_tuple = tuple(datasets.values())
+        self._keys = None
+        self._getter = _compile_getter(
+            [d.__getitem__ for d in datasets.values()], list(datasets.keys()))
 
     @property
     def is_open(self):
@@ -185,7 +324,7 @@ class CompoundDataset(Dataset):
 
     @property
     def datasets(self):
-        return tuple(self._dataset_dict.values())
+        return self._datasets_tuple
 
     def keys(self):
         if self._keys is None:
@@ -193,16 +332,31 @@ class CompoundDataset(Dataset):
         return self._keys
 
     def __getitem__(self, key):
-        return {k: v[key] for k, v in self._dataset_dict.items()}
+        return self._getter(key)
+
+    def _datasets_by_size(self):
+        """
+        `datasets` sorted by increasing length, most selective first.
+
+        Datasets without cheaply available lengths keep their order, last.
+        """
+        if self._sorted_datasets is None:
+            self._sorted_datasets = tuple(
+                sorted(self.datasets, key=_cheap_len))
+        return self._sorted_datasets
 
     def __contains__(self, key):
-        return all(key in d for d in self.datasets)
+        return all(key in d for d in self._datasets_by_size())
 
     def open(self):
+        self._keys = None
+        self._sorted_datasets = None
         for v in self.datasets:
             v.open()
 
     def close(self):
+        self._keys = None
+        self._sorted_datasets = None
         for v in self.datasets:
             v.close()
 
@@ -211,29 +365,33 @@ class CompoundDataset(Dataset):
             raise TypeError('value must have items for CompoundDataset')
         for value_key, dataset in self._dataset_dict.items():
             dataset.save_item(key, value[value_key])
+        self._keys = None
+        self._clear_keys_cache()
 
     def delete_item(self, key):
         for dataset in self.datasets:
             dataset.delete_item(key)
+        self._keys = None
+        self._clear_keys_cache()
 
 
 class ZippedDataset(CompoundDataset):
     def __init__(self, *datasets):
         self._datasets = datasets
         self._keys = None
+        self._getter = _compile_getter([d.__getitem__ for d in datasets])
 
     @property
     def datasets(self):
         return self._datasets
 
-    def __getitem__(self, key):
-        return tuple(d[key] for d in self._datasets)
-
     def save_item(self, key, value):
         if not hasattr(value, '__iter__'):
             raise TypeError('value must be iterable for ZippedDataset')
         for dataset, v in zip(self._datasets, value):
             dataset.save_item(key, v)
+        self._keys = None
+        self._clear_keys_cache()
 
 
 class MappedDataset(DelegatingDataset):
@@ -254,54 +412,134 @@ class MappedDataset(DelegatingDataset):
     def subset(self, keys, check_present=True):
         return self._base.subset(keys, check_present).map(self._map_fn)
 
+    def map(self, map_fn):
+        # fuse chained maps so access is a single wrapper deep
+        return MappedDataset(self._base, _compose(self._map_fn, map_fn))
+
+
+def _njit(fn, **kwargs):
+    import numba
+    from numba.extending import is_jitted
+    if is_jitted(fn):
+        return fn
+    return numba.njit(fn, **kwargs)
+
+
+def _njit_compose(f, g):
+    """Jitted equivalent of `lambda x: g(f(x))` for jitted `f` and `g`."""
+    import numba
+
+    @numba.njit
+    def composed(x):
+        return g(f(x))
+
+    return composed
+
+
+class NumbaMappedDataset(MappedDataset):
+    """
+    MappedDataset with `map_fn` compiled by `numba.njit`.
+
+    Chained `map_numba` calls are fused into a single compiled function.
+    Requires `numba`.
+    """
+    def __init__(self, base_dataset, map_fn):
+        super(NumbaMappedDataset, self).__init__(
+            base_dataset, _njit(map_fn, cache=True))
+
+    def map_numba(self, map_fn):
+        return NumbaMappedDataset(
+            self._base,
+            _njit_compose(self._map_fn, _njit(map_fn, cache=True)))
+
+
+def _flatten_subset(base_dataset, keys, check_present):
+    """
+    Unwrap nested `DataSubset`s so the base is the innermost dataset.
+
+    Returns `(base_dataset, keys)` where `keys` is restricted to those valid
+    in each unwrapped subset. If `check_present`, keys missing from an
+    unwrapped subset raise a `KeyError` instead.
+    """
+    while (isinstance(base_dataset, DataSubset) and
+            type(base_dataset).__getitem__ is DataSubset.__getitem__):
+        valid = base_dataset._keys
+        if check_present:
+            keys = list(keys)
+            for key in keys:
+                if key not in valid:
+                    raise KeyError('key %s not present in base' % key)
+        else:
+            keys = [k for k in keys if k in valid]
+        base_dataset = base_dataset._base
+    return base_dataset, keys
+
+
+class _SubsetKeys(dict):
+    """Identity mapping of valid keys, raising `KeyError` if missing."""
+
+    def __missing__(self, key):
+        raise errors.invalid_key_error(self, key)
+
 
 class DataSubset(DelegatingDataset):
     """Dataset with keys constrained to a given subset."""
     def __init__(self, base_dataset, keys, check_present=True):
         if base_dataset is None:
             raise ValueError('`base_dataset` cannot be None')
+        # keep lookups a single hop regardless of how many times subsetted
+        base_dataset, keys = _flatten_subset(
+            base_dataset, keys, check_present)
         self._check_present = check_present
-        self._keys = frozenset(keys)
+        # key -> key, so validation and lookup share a single probe
+        if isinstance(keys, _SubsetKeys):
+            self._keys = keys
+        else:
+            self._keys = _SubsetKeys((k, k) for k in keys)
+        self._frozen_keys = None
         super(DataSubset, self).__init__(base_dataset)
         if self.is_open:
             self._check_keys()
 
     def _check_keys(self):
-        if self._check_present:
-            for key in self._keys:
-                if key not in self._base:
-                    raise KeyError('key %s not present in base' % key)
+        if not self._check_present:
+            return
+        # probed per key: `base.keys()` may be expensive to compute
+        base = self._base
+        for key in self._keys:
+            if key not in base:
+                raise KeyError('key %s not present in base' % key)
 
     def _with_new_keys(self, keys, check_present):
         return DataSubset(self._base, keys, check_present)
 
     def subset(self, keys, check_present=True):
+        # built once here and reused by the new subset
+        keys = _SubsetKeys((k, k) for k in keys)
         if check_present:
+            valid = self._keys
             for key in keys:
-                if key not in self._keys:
+                if key not in valid:
                     raise KeyError('key %s not present in base' % key)
 
         return self._with_new_keys(keys, check_present and not self.is_open)
 
     def keys(self):
-        return self._keys
+        if self._frozen_keys is None:
+            self._frozen_keys = frozenset(self._keys)
+        return self._frozen_keys
+
+    def __contains__(self, key):
+        return key in self._keys
 
     def __getitem__(self, key):
-        if key not in self._keys:
-            raise errors.invalid_key_error(self, key)
-        return self._base[key]
+        return self._base[self._keys[key]]
 
     def save_item(self, key, value):
-        if key in self._keys:
-            self._base.save_item(key, value)
-        else:
-            raise errors.invalid_key_error(self, key)
+        self._base.save_item(self._keys[key], value)
 
     def delete_item(self, key):
-        if key in self._keys:
-            self._base.delete_item(key)
-        else:
-            raise errors.invalid_key_error(self, key)
+        self._base.delete_item(self._keys[key])
 
     def open(self):
         super(DataSubset, self).open()
@@ -341,6 +579,10 @@ class KeyMappedDataset(Dataset):
     def keys(self):
         raise errors.unknown_keys_error(self)
 
+    def map_keys(self, key_fn):
+        # fuse chained key maps so access is a single wrapper deep
+        return KeyMappedDataset(self._base, _compose(key_fn, self._key_fn))
+
     def __len__(self):
         if self._keys is None:
             return len(self._base)
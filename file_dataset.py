@@ -2,6 +2,36 @@ import os
 import core
 
 
+def _walk(path, rel_path=''):
+    """
+    Yield `(rel_path, is_dir)` pairs for the directory tree rooted at `path`.
+
+    Ordered like `os.walk`: each directory is followed by its files, then its
+    subdirectories. Symlinked directories are not descended into, and
+    unreadable directories are skipped. Entry types come from `os.scandir`, so
+    no additional `stat` calls are made on platforms which report them.
+    """
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return
+    yield rel_path, True
+    # rel_path is built here and never ends in a separator, so plain
+    # concatenation is equivalent to (and cheaper than) os.path.join
+    prefix = rel_path + os.sep if rel_path else ''
+    subdirs = []
+    for entry in entries:
+        if entry.is_dir():
+            if not entry.is_symlink():
+                subdirs.append(entry)
+        else:
+            yield prefix + entry.name, False
+    for entry in subdirs:
+        for pair in _walk(entry.path, prefix + entry.name):
+            yield pair
+
+
 class _PathDataset(core.Dataset):
     def __init__(self, root_dir, mode='r'):
         self._root_dir = root_dir
@@ -13,25 +43,36 @@ class _PathDataset(core.Dataset):
     def path(self, key):
         return os.path.join(self._root_dir, key)
 
+    def _iter_entries(self):
+        """Yield `(key, is_dir)` pairs for all entries under the root."""
+        return _walk(self._root_dir)
+
 
 class DirectoryDataset(_PathDataset):
     def __contains__(self, key):
         return os.path.exists(self.path(key))
 
-    def __getitem__(self, key):
+    def _get(self, key, is_dir):
         path = self.path(key)
-        if os.path.isdir(path):
+        if is_dir:
             return DirectoryDataset(path, self._mode)
         else:
             return open(path, self._mode)
 
+    def __getitem__(self, key):
+        return self._get(key, os.path.isdir(self.path(key)))
+
     def keys(self):
-        n = len(self._root_dir) + 1
-        for dirpath, dirnames, filenames in os.walk(self._root_dir):
-            dp = dirpath[n:]
-            yield dp
-            for filename in filenames:
-                yield os.path.join(dp, filename)
+        for key, _ in self._iter_entries():
+            yield key
+
+    def values(self):
+        for key, is_dir in self._iter_entries():
+            yield self._get(key, is_dir)
+
+    def items(self):
+        for key, is_dir in self._iter_entries():
+            yield key, self._get(key, is_dir)
 
 
 class FileDataset(_PathDataset):
@@ -42,8 +83,6 @@ class FileDataset(_PathDataset):
         return open(self.path(key), self._mode)
 
     def keys(self):
-        n = len(self._root_dir) + 1
-        for dirpath, dirnames, filenames in os.walk(self._root_dir):
-            dp = dirpath[n:]
-            for filename in filenames:
-                yield os.path.join(dp, filename)
+        for key, is_dir in self._iter_entries():
+            if not is_dir:
+                yield key
@@ -6,10 +6,29 @@ import save
 
 
 class Hdf5Dataset(core.DictDataset, save.SavingDataset):
-    def __init__(self, path, mode='r'):
+    """
+    Dataset backed by an hdf5 file.
+
+    `libver='latest'` writes files in the latest file format, which older
+    HDF5 versions cannot read. `rdcc_*` arguments tune the raw data chunk
+    cache, which is allocated per open dataset rather than per file. h5py's
+    defaults are used for any of these which are None. `swmr=True` opens
+    files in single-writer/multiple-reader mode when `mode == 'r'`, which
+    requires files written with `libver='latest'`.
+    """
+    _memoize_keys = True
+
+    def __init__(self, path, mode='r', libver=None,
+                 rdcc_nbytes=None, rdcc_nslots=None, rdcc_w0=None,
+                 swmr=False):
         self._path = path
         self._mode = mode
         self._base = None
+        self._file_kwargs = dict(
+            libver=libver, rdcc_nbytes=rdcc_nbytes, rdcc_nslots=rdcc_nslots,
+            rdcc_w0=rdcc_w0)
+        if swmr and mode == 'r':
+            self._file_kwargs['swmr'] = True
 
     @property
     def path(self):
@@ -29,7 +48,8 @@ class Hdf5Dataset(core.DictDataset, save.SavingDataset):
             folder = os.path.dirname(self._path)
             if not os.path.isdir(folder):
                 os.makedirs(folder)
-        self._base = h5py.File(self._path, self._mode)
+        self._base = h5py.File(self._path, self._mode, **self._file_kwargs)
+        self._clear_keys_cache()
 
     def is_writable(self):
         return self._mode in ('a', 'w')
@@ -38,6 +58,14 @@ class Hdf5Dataset(core.DictDataset, save.SavingDataset):
         if self.is_open:
             self._base.close()
             self._base = None
+        self._clear_keys_cache()
+
+    def flush(self, durable=False):
+        if not self.is_open:
+            return
+        self._base.flush()
+        if durable and self.is_writable():
+            os.fsync(self._base.id.get_vfd_handle())
 
     def _save_np(self, group, key, value, attrs=None):
         assert(isinstance(value, np.ndarray))
@@ -48,33 +76,50 @@ class Hdf5Dataset(core.DictDataset, save.SavingDataset):
         return dataset
 
     def _save_item(self, group, key, value):
-        if isinstance(value, np.ndarray):
-            return group.create_dataset(key, data=value)
-        elif key == 'attrs':
-            if not hasattr(value, 'items'):
-                raise ValueError('attrs value must have `items` attr')
-            for k, v in value.items():
-                group.attrs[k] = v
-        elif hasattr(value, 'items'):
-            try:
-                subgroup = group.create_group(key)
-                for k, v in value.items():
-                    self._save_item(subgroup, k, v)
-                return subgroup
-            except Exception:
-                if key in subgroup:
-                    del subgroup[key]
-                raise
-        else:
-            raise TypeError(
-                'value must be numpy array or have `items` attr, got %s'
-                % str(value))
+        """
+        Save `value` under `key` in `group` and return the created node.
+
+        Nested mappings are traversed with an explicit stack rather than
+        recursively. If saving fails, anything created under `key` is
+        removed before re-raising.
+        """
+        created = None
+        stack = [(group, key, value)]
+        try:
+            while stack:
+                g, k, v = stack.pop()
+                if type(v) is np.ndarray or isinstance(v, np.ndarray):
+                    node = g.create_dataset(k, data=v)
+                elif k == 'attrs':
+                    if not hasattr(v, 'items'):
+                        raise ValueError('attrs value must have `items` attr')
+                    for attr_key, attr_value in v.items():
+                        g.attrs[attr_key] = attr_value
+                    continue
+                elif hasattr(v, 'items'):
+                    node = g.create_group(k)
+                    # reversed so children are created in iteration order
+                    stack.extend(
+                        (node, ck, cv) for ck, cv in reversed(list(v.items())))
+                else:
+                    raise TypeError(
+                        'value must be numpy array or have `items` attr, '
+                        'got %s' % str(v))
+                if created is None:
+                    created = node
+        except Exception:
+            if created is not None and key in group:
+                del group[key]
+            raise
+        return created
 
     def save_item(self, key, value):
         self._save_item(self._base, key, value)
+        self._clear_keys_cache()
 
     def delete_item(self, key):
         del self._base[key]
+        self._clear_keys_cache()
 
 
 class Hdf5AutoSavingManager(save.AutoSavingManager):
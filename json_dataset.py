@@ -1,54 +1,143 @@
 import os
 import json
+import math
+import re
 import core
 import save
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# integers with this many digits may not fit in 64 bits, which orjson
+# silently parses as floats
+_LONG_DIGITS = re.compile(rb'\d{19}')
+
+
+def _loads(raw):
+    """Parse JSON bytes, using `orjson` if available and exact."""
+    if orjson is not None and _LONG_DIGITS.search(raw) is None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # e.g. NaN/Infinity as written by the standard library
+            pass
+    return json.loads(raw)
+
+
+def _has_non_finite(obj):
+    """True if `obj` contains a NaN or infinite float."""
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(v) for v in obj)
+    dtype = getattr(obj, 'dtype', None)
+    if dtype is not None and dtype.kind in 'fc':
+        import numpy as np
+        return not np.isfinite(obj).all()
+    return False
+
+
+def _dumps(obj):
+    """Encode `obj` as JSON bytes, using `orjson` if available."""
+    if orjson is not None:
+        try:
+            data = orjson.dumps(obj, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # fall back to the standard library's handling/error
+            pass
+        else:
+            # orjson writes NaN/Infinity as null, so only check if present
+            if b'null' not in data or not _has_non_finite(obj):
+                return data
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
 
 class JsonDataset(save.SavingDataset, core.DictDataset):
+    _memoize_keys = True
+
     def __init__(self, path, mode='r'):
         self._path = path
         self._mode = mode
+        self._is_writable = mode in ('a', 'w')
         self._base = None
+        self._dirty = False
 
     @property
     def is_open(self):
         return self._base is not None
 
     def open(self):
-        if self._mode in ('r', 'a') and os.path.isfile(self._path):
-            if os.path.isfile(self._path):
-                with open(self._path, 'r') as fp:
-                    self._base = json.load(fp)
-            else:
-                self._base = {}
+        exists = os.path.isfile(self._path)
+        if self._mode == 'r' and not exists:
+            raise IOError('No file at %s' % self._path)
+        if self._mode in ('r', 'a') and exists:
+            with open(self._path, 'rb') as fp:
+                raw = fp.read()
+            self._base = _loads(raw)
         else:
             self._base = {}
+        # 'w' truncates any existing file and 'a' creates a missing one, even
+        # if nothing is saved
+        self._dirty = self._mode == 'w' or (self._mode == 'a' and not exists)
+        self._clear_keys_cache()
 
     def is_writable(self):
-        return self._mode in ('a', 'w')
+        return self._is_writable
 
-    def close(self):
-        if self.is_writable():
-            folder = os.path.dirname(self._path)
-            if not os.path.isdir(folder):
-                os.makedirs(folder)
+    def flush(self, durable=False):
+        if not (self._dirty and self._is_writable):
+            return
+        folder = os.path.dirname(self._path) or '.'
+        os.makedirs(folder, exist_ok=True)
+        data = _dumps(self._base)
+        # written to a temporary file and swapped in, so a failure or crash
+        # leaves any existing file intact
+        tmp_path = self._path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as fp:
+                fp.write(data)
+                if durable:
+                    fp.flush()
+                    os.fsync(fp.fileno())
+            os.replace(tmp_path, self._path)
+        except Exception:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if durable:
+            fd = os.open(folder, os.O_RDONLY)
             try:
-                with open(self._path, 'w') as fp:
-                    json.dump(self._base, fp)
-            except Exception:
-                os.remove(self._path)
-                raise
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self._dirty = False
+
+    def close(self):
+        self.flush()
         self._base = None
+        self._dirty = False
+        self._clear_keys_cache()
 
     def save_item(self, key, value):
-        if self.is_writable():
+        if self._is_writable:
             self._base[key] = value
+            self._dirty = True
+            self._clear_keys_cache()
         else:
             raise IOError('Cannot write to non-writable JsonDataset')
 
     def delete_item(self, key):
-        if self.is_writable():
+        if self._is_writable:
             del self._base[key]
+            self._dirty = True
+            self._clear_keys_cache()
         else:
             raise IOError('Cannot delete from non-writable JsonDataset')
 
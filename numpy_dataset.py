@@ -3,30 +3,202 @@ import numpy as np
 import save
 
 
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
 class NumpyDataset(save.SavingDataset):
-    def __init__(self, base_dir):
+    """
+    Dataset of numpy arrays saved under `base_dir`.
+
+    By default each array is saved to its own `.npy` file in `base_dir`. If
+    `archive` is True, arrays are instead stored in a single
+    `base_dir + '.npz'` archive. Changes are staged in memory and the archive
+    is only written on `flush`/`close`, so archive datasets must be opened
+    before use.
+
+    If `use_mmap` is True, `.npy` files are memory-mapped rather than read, so
+    returned arrays are read-only views backed by the page cache. Ignored for
+    archive datasets.
+
+    The `base_dir` listing is cached until the next `open`/`close`, so `keys`
+    does not reflect files added by other writers in the meantime. Membership
+    checks fall back to the file system for keys missing from the listing.
+    """
+    def __init__(self, base_dir, archive=False, use_mmap=False):
         self._base_dir = base_dir
+        self._archive = archive
+        self._mmap_mode = 'r' if use_mmap else None
+        self._npz = None
+        self._stored = frozenset()
+        self._pending = None
+        self._deleted = None
+        # cached .npy keys: mutable set for membership, frozen copy for keys
+        self._key_set = None
+        self._frozen_keys = None
+        # .npy paths written since the last durable flush
+        self._unsynced = set()
+        self._dir_unsynced = False
+
+    @property
+    def archive_path(self):
+        return self._base_dir + '.npz'
+
+    def open(self):
+        if self._archive and self._pending is None:
+            if os.path.isfile(self.archive_path):
+                self._npz = np.load(self.archive_path)
+                self._stored = frozenset(self._npz.files)
+            self._pending = {}
+            self._deleted = set()
+        self._clear_listing()
+
+    def close(self):
+        if self._archive and self._pending is not None:
+            self.flush()
+            if self._npz is not None:
+                self._npz.close()
+            self._npz = None
+            self._stored = frozenset()
+            self._pending = None
+            self._deleted = None
+        self._clear_listing()
+
+    def _check_archive_open(self):
+        if self._pending is None:
+            raise IOError('NumpyDataset archive not open')
+
+    def _clear_listing(self):
+        self._key_set = None
+        self._frozen_keys = None
+
+    def _write_archive(self):
+        arrays = {k: self[k] for k in self.keys()}
+        if self._npz is not None:
+            self._npz.close()
+            self._npz = None
+        folder = os.path.dirname(self.archive_path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        # np.savez appends '.npz' to paths without it
+        tmp_path = self._base_dir + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, self.archive_path)
+        self._npz = np.load(self.archive_path)
+        self._stored = frozenset(self._npz.files)
+        self._pending = {}
+        self._deleted = set()
+
+    def flush(self, durable=False):
+        """
+        Write any staged archive changes, syncing to disk if `durable`.
+
+        For non-archive datasets `.npy` files are written on `save_item`, and
+        a durable flush syncs all files written since the last durable flush
+        along with `base_dir` itself, so new names are persisted.
+        """
+        if self._archive:
+            if self._pending is None:
+                return
+            if self._pending or self._deleted:
+                self._write_archive()
+                self._dir_unsynced = True
+            if durable and self._dir_unsynced:
+                _fsync(self.archive_path)
+                _fsync(os.path.dirname(self.archive_path) or '.')
+                self._dir_unsynced = False
+        elif durable:
+            for path in self._unsynced:
+                if os.path.isfile(path):
+                    _fsync(path)
+            self._unsynced.clear()
+            if self._dir_unsynced:
+                _fsync(self._base_dir)
+                self._dir_unsynced = False
 
     def keys(self):
-        return (k[:-4] for k in os.listdir(self._base_dir))
+        if self._archive:
+            self._check_archive_open()
+        if self._frozen_keys is None:
+            if self._archive:
+                self._frozen_keys = (
+                    self._stored - self._deleted).union(self._pending)
+            else:
+                self._frozen_keys = frozenset(self._listed_keys())
+        return self._frozen_keys
+
+    def _listed_keys(self):
+        if self._key_set is None:
+            try:
+                names = os.listdir(self._base_dir)
+            except FileNotFoundError:
+                names = ()
+            self._key_set = set(k[:-4] for k in names)
+        return self._key_set
 
     def _path(self, key):
         return os.path.join(self._base_dir, '%s.npy' % key)
 
     def __getitem__(self, key):
-        return np.load(self._path(key))
+        if self._archive:
+            self._check_archive_open()
+            if key in self._pending:
+                return self._pending[key]
+            if key not in self._stored or key in self._deleted:
+                raise KeyError(key)
+            return self._npz[key]
+        return np.load(self._path(key), mmap_mode=self._mmap_mode)
 
     def __contains__(self, key):
-        return os.path.isfile(self._path(key))
+        if self._archive:
+            self._check_archive_open()
+            return key in self._pending or (
+                key in self._stored and key not in self._deleted)
+        key_set = self._listed_keys()
+        if key in key_set:
+            return True
+        # may have been written since listing, e.g. by another instance
+        if os.path.isfile(self._path(key)):
+            key_set.add(key)
+            self._frozen_keys = None
+            return True
+        return False
 
     def save_item(self, key, value):
         if not isinstance(value, np.ndarray):
             raise TypeError('value must be a numpy array.')
-        np.save(self._path(key), value)
+        if self._archive:
+            self._check_archive_open()
+            self._pending[key] = value
+            self._deleted.discard(key)
+        else:
+            path = self._path(key)
+            np.save(path, value)
+            self._unsynced.add(path)
+            self._dir_unsynced = True
+            if self._key_set is not None:
+                self._key_set.add(key)
+        self._frozen_keys = None
 
     def delete_item(self, key):
-        os.remove(self._path(key))
+        if self._archive:
+            self._check_archive_open()
+            if key not in self:
+                raise KeyError(key)
+            self._pending.pop(key, None)
+            if key in self._stored:
+                self._deleted.add(key)
+        else:
+            os.remove(self._path(key))
+            self._dir_unsynced = True
+            if self._key_set is not None:
+                self._key_set.discard(key)
+        self._frozen_keys = None
 
     @property
     def is_open(self):
-        return True
+        return not self._archive or self._pending is not None
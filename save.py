@@ -1,15 +1,70 @@
+import collections
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
 import core
 from progress.bar import IncrementalBar
 
 
 class DummyBar(object):
-    def next(self):
+    def next(self, n=1):
         pass
 
-    def finish():
+    def finish(self):
         pass
 
 
+class BatchedBar(object):
+    """
+    Wrapper around a progress bar which updates it in batches.
+
+    The wrapped bar is advanced every `every` items or `interval` seconds,
+    whichever comes first, rather than redrawn for every item.
+    """
+    def __init__(self, bar, every=64, interval=0.1):
+        self._bar = bar
+        self._every = every
+        self._interval = interval
+        self._count = 0
+        self._last = time.monotonic()
+
+    def next(self, n=1):
+        self._count += n
+        if (self._count >= self._every or
+                time.monotonic() - self._last > self._interval):
+            self._flush()
+
+    def _flush(self):
+        if self._count > 0:
+            self._bar.next(self._count)
+            self._count = 0
+        self._last = time.monotonic()
+
+    def finish(self):
+        self._flush()
+        self._bar.finish()
+
+
+def _prefetch_iter(keys, getter, n=4):
+    """
+    Yield `(key, getter(key))` pairs in order, fetching up to `n` values ahead.
+
+    Values are fetched on a thread pool so calls to `getter` overlap with
+    whatever the consumer does with earlier values, so `getter` must be
+    thread-safe. `keys` is only iterated on the consuming thread.
+    """
+    keys = iter(keys)
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        pending = collections.deque(
+            (key, executor.submit(getter, key))
+            for key in itertools.islice(keys, n))
+        while pending:
+            key, future = pending.popleft()
+            for next_key in itertools.islice(keys, 1):
+                pending.append((next_key, executor.submit(getter, next_key)))
+            yield key, future.result()
+
+
 class SavingDataset(core.Dataset):
     def save_item(self, key, value):
         raise NotImplementedError('Abstract method')
@@ -23,44 +78,85 @@ class SavingDataset(core.Dataset):
     def __delitem__(self, key):
         self.delete_item(key)
 
+    def flush(self, durable=False):
+        """
+        Persist any saved changes.
+
+        If `durable`, changes are also synced to disk (`os.fsync`) so they
+        survive a crash. `save_dataset` and `save_items` called with
+        `durable=True` call this once after saving all items, rather than
+        once per item.
+        """
+        pass
+
     def save_dataset(self, dataset, overwrite=False, show_progress=True,
-                     message=None):
+                     message=None, prefetch=0, durable=False):
+        """
+        Save all values of `dataset`.
+
+        If `prefetch` is positive, up to that many values are read from
+        `dataset` concurrently ahead of being saved. Only use this if
+        `dataset` supports concurrent reads.
+
+        If `durable`, saved values are synced to disk with a single `flush`
+        after saving all values.
+        """
         if not self.is_open:
             raise IOError('Cannot save to non-open dataset.')
-        keys = dataset.keys()
+        # materialized once: keys may be a generator, and are used repeatedly
+        keys = list(dataset.keys())
+        # a fast path only: keys() may not list every key `in self`, e.g.
+        # nested Hdf5Dataset paths, so misses are checked with `in`
+        existing = set(self.keys())
         if not overwrite:
-            keys = [k for k in keys if k not in self]
+            keys = [k for k in keys if k not in existing and k not in self]
         if len(keys) == 0:
             return
         if message is not None:
             print(message)
-        bar = IncrementalBar(max=len(keys)) if show_progress else DummyBar()
-        for key in keys:
+        if show_progress:
+            bar = BatchedBar(IncrementalBar(max=len(keys)))
+        else:
+            bar = DummyBar()
+        if prefetch > 0:
+            items = _prefetch_iter(keys, dataset.__getitem__, prefetch)
+        else:
+            items = ((key, dataset[key]) for key in keys)
+        for key, value in items:
             bar.next()
-            if key in self:
+            if key in existing or key in self:
                 self.delete_item(key)
-            value = dataset[key]
             self.save_item(key, value)
+            existing.add(key)
+        if durable:
+            self.flush(durable=True)
         bar.finish()
 
-    def save_items(self, items, overwrite=False, show_progress=True):
+    def save_items(self, items, overwrite=False, show_progress=True,
+                   durable=False):
+        """Save `(key, value)` pairs of `items`. See `save_dataset`."""
         if not self.is_open:
             raise IOError('Cannot save to non-open dataset.')
         if show_progress:
             if hasattr(items, '__len__'):
-                bar = IncrementalBar(max=len(items))
+                bar = BatchedBar(IncrementalBar(max=len(items)))
             else:
-                bar = IncrementalBar()
+                bar = BatchedBar(IncrementalBar())
         else:
             bar = DummyBar()
+        # see `save_dataset`
+        existing = set(self.keys())
         for key, value in items:
             bar.next()
-            if key in self:
+            if key in existing or key in self:
                 if overwrite:
                     self.delete_item(key)
                 else:
                     continue
             self.save_item(key, value)
+            existing.add(key)
+        if durable:
+            self.flush(durable=True)
         bar.finish()
 
     def subset(self, keys, check_present=True):
@@ -80,18 +176,34 @@ class SavingDataSubset(SavingDataset, core.DataSubset):
     def delete_item(self, key):
         self._base.delete_item(key)
 
+    def flush(self, durable=False):
+        self._base.flush(durable)
+
     def _with_new_keys(self, keys, check_present):
         return SavingDataSubset(self._base, keys, check_present)
 
 
 class AutoSavingDataset(core.Dataset):
-    def __init__(self, src, dst):
+    """
+    Dataset which gets values from `dst`, or from `src` and saves them to
+    `dst` if not already saved.
+
+    If `cache_size` is positive, up to that many recently accessed values are
+    kept in memory and shared with subsets. Cached values are returned as the
+    same objects on each access, so mutating a returned value changes later
+    reads. Changes made to `dst` directly rather than through this dataset
+    (or its subsets) are not seen by cached keys. The cache is cleared on
+    `open`/`close`.
+    """
+    def __init__(self, src, dst, cache_size=0):
         if not isinstance(dst, SavingDataset):
             raise TypeError('`dst` must be a `SavingDataset`')
         if not all(hasattr(src, k) for k in ('items', '__getitem__')):
             raise TypeError('`src` must have `items` and `__getitem__` attrs')
         self._src = src
         self._dst = dst
+        self._cache_size = cache_size
+        self._cache = collections.OrderedDict()
 
     @property
     def src(self):
@@ -113,23 +225,80 @@ class AutoSavingDataset(core.Dataset):
         return key in self._src
 
     def __getitem__(self, key):
+        cache = self._cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
         if key in self._dst:
-            return self._dst[key]
+            value = self._dst[key]
         else:
             value = self._src[key]
             self._dst.save_item(key, value)
-            return value
+        self._cache_value(key, value)
+        return value
+
+    def _cache_value(self, key, value):
+        if self._cache_size > 0:
+            cache = self._cache
+            cache[key] = value
+            if len(cache) > self._cache_size:
+                cache.popitem(last=False)
+
+    def iter_prefetched(self, keys=None, ahead=8):
+        """
+        Iterate over `(key, value)` pairs, fetching from `src` in advance.
+
+        Values for up to `ahead` upcoming keys are read from `src` on a thread
+        pool while the caller processes the current one. Keys already saved in
+        `dst` are not fetched, and `dst` is only accessed from the calling
+        thread. `src` must support concurrent reads.
+
+        Args:
+            keys: keys to iterate over, in order. Defaults to `src.keys()`.
+            ahead: maximum number of values fetched in advance.
+        """
+        if keys is None:
+            keys = self._src.keys()
+        src = self._src
+        dst = self._dst
+
+        def fetch(marked):
+            key, saved = marked
+            return None if saved else src[key]
+
+        # evaluated lazily by `_prefetch_iter` on the calling thread
+        marked = ((key, key in dst) for key in keys)
+        for (key, saved), value in _prefetch_iter(marked, fetch, ahead):
+            # key may have been saved since it was fetched, e.g. if repeated
+            if saved or key in dst:
+                yield key, self[key]
+            else:
+                dst.save_item(key, value)
+                self._cache_value(key, value)
+                yield key, value
+
+    def save_item(self, key, value):
+        self._cache.pop(key, None)
+        self._dst.save_item(key, value)
+
+    def delete_item(self, key):
+        self._cache.pop(key, None)
+        self._dst.delete_item(key)
 
-    def save_all(self, overwrite=False, show_progress=True, message=None):
+    def save_all(self, overwrite=False, show_progress=True, message=None,
+                 prefetch=0, durable=False):
+        self._cache.clear()
         self.dst.save_dataset(
             self.src, overwrite=overwrite, show_progress=show_progress,
-            message=message)
+            message=message, prefetch=prefetch, durable=durable)
 
     def open(self):
+        self._cache.clear()
         self.src.open()
         self.dst.open()
 
     def close(self):
+        self._cache.clear()
         self.dst.close()
         self.src.close()
 
@@ -137,7 +306,10 @@ class AutoSavingDataset(core.Dataset):
         src = self.src.subset(keys, check_present)
         # dst = self.dst.subset(keys, False)
         dst = self.dst
-        return AutoSavingDataset(src, dst)
+        subset = AutoSavingDataset(src, dst, self._cache_size)
+        # share the cache so saves through either evict stale values
+        subset._cache = self._cache
+        return subset
 
 
 def get_auto_saving_dataset_fn(lazy_fn, saving_fn):
@@ -175,25 +347,3 @@ class AutoSavingManager(object):
     def get_saved_dataset(self):
         self.save_all()
         return self.get_saving_dataset(mode='r')
-
-# class AutoSavingManager(object):
-#
-#     def get_lazy_dataset(self, *args, **kwargs):
-#         raise NotImplementedError('Abstract method')
-#
-#     def get_saving_dataset(self, *args, **kwargs):
-#         raise NotImplementedError('Abstract method')
-#
-#     def get_auto_saving_dataset(self, *args, **kwargs):
-#         mode = kwargs.pop('mode', 'a')
-#         src = self.get_lazy_dataset(*args, **kwargs)
-#         kwargs['mode'] = mode
-#         dst = self.get_saving_dataset(*args, **kwargs)
-#         return AutoSavingDataset(src, dst)
-#
-#     def save_all(self, *args, **kwargs):
-#         overwrite = kwargs.pop('overwrite', False)
-#         kwargs['mode'] = 'a'
-#         message = kwargs.pop('message', None)
-#         with self.get_auto_saving_dataset(*args, **kwargs) as ds:
-#             ds.save_all(overwrite=overwrite, message=message)
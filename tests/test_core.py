@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+import core
+import file_dataset
+
+
+class DataSubsetTest(unittest.TestCase):
+    def setUp(self):
+        self._base = core.Dataset.from_dict({'a': 1, 'b': 2, 'c': 3})
+
+    def test_subset(self):
+        subset = self._base.subset(['a', 'b'])
+        self.assertEqual(subset.keys(), frozenset(('a', 'b')))
+        self.assertEqual(subset['a'], 1)
+        self.assertNotIn('c', subset)
+        self.assertRaises(KeyError, subset.__getitem__, 'c')
+
+    def test_missing_key_raises(self):
+        self.assertRaises(KeyError, self._base.subset, ['a', 'd'])
+
+    def test_nested_subset_flattened(self):
+        subset = self._base.subset(['a', 'b']).subset(['a'])
+        self.assertIs(subset._base, self._base)
+        self.assertEqual(subset.to_dict(), {'a': 1})
+        self.assertRaises(
+            KeyError, core.DataSubset, self._base.subset(['a']), ['b'])
+
+    def test_nested_subset_unchecked(self):
+        subset = core.DataSubset(
+            self._base.subset(['a']), ['a', 'b'], check_present=False)
+        self.assertEqual(subset.keys(), frozenset(('a',)))
+
+
+class CompoundDatasetTest(unittest.TestCase):
+    def test_compound(self):
+        x = core.Dataset.from_dict({'a': 1, 'b': 2})
+        y = core.Dataset.from_dict({'b': 3, 'c': 4})
+        compound = core.Dataset.compound(x=x, y=y)
+        self.assertEqual(compound.keys(), frozenset(('b',)))
+        self.assertIn('b', compound)
+        self.assertNotIn('a', compound)
+        self.assertEqual(compound['b'], {'x': 2, 'y': 3})
+        self.assertEqual(core.Dataset.zip(x, y)['b'], (2, 3))
+
+
+class ToDictTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self._dir, 'sub'))
+        for name in ('a', os.path.join('sub', 'b')):
+            with open(os.path.join(self._dir, name), 'w') as fp:
+                fp.write(name)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_generator_keys(self):
+        values = file_dataset.FileDataset(self._dir).to_dict()
+        self.assertEqual(sorted(values), ['a', os.path.join('sub', 'b')])
+        for fp in values.values():
+            fp.close()
+
+    def test_mapped(self):
+        base = {'a': 1}
+        mapped = core.Dataset.from_dict(base).map(lambda x: x * 2)
+        base['b'] = 2
+        self.assertEqual(mapped.to_dict(), {'a': 2, 'b': 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
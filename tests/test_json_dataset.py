@@ -0,0 +1,60 @@
+import math
+import os
+import shutil
+import tempfile
+import unittest
+import json_dataset
+
+
+class JsonDatasetTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, 'data.json')
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _round_trip(self, value):
+        with json_dataset.JsonDataset(self._path, 'w') as dataset:
+            dataset['k'] = value
+        with json_dataset.JsonDataset(self._path, 'r') as dataset:
+            return dataset['k']
+
+    def test_read_missing_raises(self):
+        dataset = json_dataset.JsonDataset(self._path, 'r')
+        self.assertRaises(IOError, dataset.open)
+
+    def test_write_truncates_without_loading(self):
+        with open(self._path, 'w') as fp:
+            fp.write('not json')
+        with json_dataset.JsonDataset(self._path, 'w') as dataset:
+            self.assertEqual(len(dataset), 0)
+        with json_dataset.JsonDataset(self._path, 'r') as dataset:
+            self.assertEqual(dataset.to_dict(), {})
+
+    def test_append_creates_missing(self):
+        with json_dataset.JsonDataset(self._path, 'a'):
+            pass
+        self.assertTrue(os.path.isfile(self._path))
+
+    def test_flush(self):
+        with json_dataset.JsonDataset(self._path, 'w') as dataset:
+            dataset['a'] = 1
+            dataset.flush(durable=True)
+            with json_dataset.JsonDataset(self._path, 'r') as saved:
+                self.assertEqual(saved.to_dict(), {'a': 1})
+        self.assertEqual(os.listdir(self._dir), ['data.json'])
+
+    def test_non_finite_round_trip(self):
+        self.assertTrue(math.isnan(self._round_trip(float('nan'))))
+        self.assertEqual(
+            self._round_trip([float('inf'), None]), [float('inf'), None])
+
+    def test_big_int_round_trip(self):
+        value = self._round_trip({'a': 2**70, 'b': -2**63 - 1})
+        self.assertEqual(value, {'a': 2**70, 'b': -2**63 - 1})
+        self.assertIsInstance(value['a'], int)
+
+
+if __name__ == '__main__':
+    unittest.main()
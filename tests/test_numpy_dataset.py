@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import numpy_dataset
+
+
+class NumpyDatasetTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._base_dir = os.path.join(self._dir, 'arrays')
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_files(self):
+        os.makedirs(self._base_dir)
+        dataset = numpy_dataset.NumpyDataset(self._base_dir)
+        dataset['a'] = np.arange(3)
+        np.testing.assert_equal(dataset['a'], np.arange(3))
+        self.assertEqual(dataset.keys(), frozenset(('a',)))
+        other = numpy_dataset.NumpyDataset(self._base_dir)
+        other.keys()
+        dataset['b'] = np.arange(2)
+        self.assertIn('b', other)
+
+    def test_missing_dir(self):
+        self.assertNotIn('a', numpy_dataset.NumpyDataset(self._base_dir))
+
+    def test_archive(self):
+        with numpy_dataset.NumpyDataset(self._base_dir, archive=True) as ds:
+            ds['a'] = np.arange(3)
+            ds['b'] = np.ones(2)
+            del ds['b']
+        self.assertTrue(os.path.isfile(self._base_dir + '.npz'))
+        with numpy_dataset.NumpyDataset(self._base_dir, archive=True) as ds:
+            self.assertEqual(ds.keys(), frozenset(('a',)))
+            np.testing.assert_equal(ds['a'], np.arange(3))
+
+    def test_closed_archive_raises(self):
+        dataset = numpy_dataset.NumpyDataset(self._base_dir, archive=True)
+        self.assertRaises(IOError, dataset.keys)
+        self.assertRaises(IOError, dataset.__getitem__, 'a')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+import core
+import json_dataset
+import save
+
+
+class SaveTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, 'data.json')
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_save_dataset(self):
+        src = core.Dataset.from_dict({'a': 1, 'b': 2})
+        with json_dataset.JsonDataset(self._path, 'w') as dst:
+            dst['a'] = 0
+            dst.save_dataset(src, show_progress=False, prefetch=2)
+            self.assertEqual(dst.to_dict(), {'a': 0, 'b': 2})
+            dst.save_dataset(
+                src, overwrite=True, show_progress=False, durable=True)
+            self.assertEqual(dst.to_dict(), {'a': 1, 'b': 2})
+
+    def test_save_items(self):
+        with json_dataset.JsonDataset(self._path, 'w') as dst:
+            dst.save_items([('a', 1), ('a', 2)], show_progress=False)
+            self.assertEqual(dst['a'], 1)
+            dst.save_items([('a', 3)], overwrite=True, show_progress=False)
+            self.assertEqual(dst['a'], 3)
+
+    def test_iter_prefetched(self):
+        calls = []
+
+        def fn(key):
+            calls.append(key)
+            return len(key)
+
+        src = core.FunctionDataset(fn)
+        with save.AutoSavingDataset(
+                src, json_dataset.JsonDataset(self._path, 'w')) as dataset:
+            dataset['aa']
+            keys = ['aa', 'b', 'ccc', 'b']
+            items = list(dataset.iter_prefetched(keys, ahead=2))
+            self.assertEqual(items, [(k, len(k)) for k in keys])
+            self.assertEqual(sorted(dataset.dst.keys()), ['aa', 'b', 'ccc'])
+            self.assertNotIn('aa', calls[1:])
+
+    def test_prefetched_error(self):
+        def fn(key):
+            raise ValueError(key)
+
+        with save.AutoSavingDataset(
+                core.FunctionDataset(fn),
+                json_dataset.JsonDataset(self._path, 'w')) as dataset:
+            self.assertRaises(
+                ValueError, list, dataset.iter_prefetched(['a']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,33 +1,55 @@
 import zipfile
-import core
+import save
 
 
-class ZipFileDataset(core.Dataset):
+class ZipFileDataset(save.SavingDataset):
     def __init__(self, path, mode='r'):
         self._file = None
         self._path = path
         self._mode = mode
         self._keys = None
+        self._infos = None
 
     def open(self):
         if self._file is None:
             self._file = zipfile.ZipFile(self._path, self._mode)
+            self._infos = {
+                info.filename: info for info in self._file.infolist()}
 
     def close(self):
         if self._file is None:
             return
         self._file.close()
         self._file = None
+        self._infos = None
+        self._keys = None
+
+    def is_writable(self):
+        return self._mode in ('a', 'w', 'x')
 
     def keys(self):
-        if not self.open:
+        if not self.is_open:
             raise RuntimeError('Cannot check keys of closed dataset.')
         if self._keys is None:
-            self._keys = frozenset(self._file.namelist())
+            self._keys = frozenset(self._infos)
         return self._keys
 
     def __getitem__(self, key):
-        return self._file.open(key)
+        # passing the ZipInfo skips the name lookup in ZipFile.open
+        return self._file.open(self._infos[key])
+
+    def save_item(self, key, value):
+        if not self.is_writable():
+            raise IOError('Cannot write to non-writable ZipFileDataset')
+        if key in self._infos:
+            # zipfile would silently append a duplicate entry
+            raise IOError('Entry %s already exists in ZipFileDataset' % key)
+        self._file.writestr(key, value)
+        self._infos[key] = self._file.getinfo(key)
+        self._keys = None
+
+    def delete_item(self, key):
+        raise IOError('Cannot delete entries from ZipFileDataset')
 
     @property
     def is_open(self):